@@ -0,0 +1,260 @@
+"""
+Admission Control for the Prediction Endpoint
+
+This module bounds the amount of work that can pile up behind the model.
+Requests are admitted through a per-client rate limit, a bounded wait queue
+and a concurrency limit. Requests that cannot be served before their deadline
+are rejected quickly (429/503 with Retry-After) or, in degraded mode, answered
+with the last cached or precomputed forecast.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being served"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value in whole seconds, as required by HTTP"""
+        return str(max(1, int(math.ceil(self.retry_after))))
+
+
+class TokenBucket:
+    """Simple token bucket used for per-client rate limiting"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Try to take a token from the bucket
+
+        Returns:
+            0.0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded queue, rate limits and load shedding"""
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 16,
+                 rate_per_client: float = 5.0, burst_per_client: int = 10,
+                 deadline: float = 5.0, degraded_mode: bool = True,
+                 max_clients: int = 10000, max_cached: int = 1024):
+        """
+        Initialize the admission controller
+
+        Args:
+            max_concurrent: Number of predictions allowed to run at once
+            max_queue: Number of requests allowed to wait for a free slot
+            rate_per_client: Sustained requests per second allowed per client
+            burst_per_client: Requests a client may send in a single burst
+            deadline: Seconds a request may spend waiting and running
+            degraded_mode: Serve cached forecasts instead of rejecting on overload
+            max_clients: Number of client rate limit buckets kept in memory
+            max_cached: Number of cached forecasts kept for degraded mode
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.rate_per_client = rate_per_client
+        self.burst_per_client = burst_per_client
+        self.deadline = deadline
+        self.degraded_mode = degraded_mode
+        self.max_clients = max_clients
+        self.max_cached = max_cached
+
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._service_time = None  # EWMA of prediction latency in seconds
+        self._buckets = OrderedDict()
+        self._cache = OrderedDict()
+        self._fallback = None
+
+        self.stats = {
+            'admitted': 0,
+            'rate_limited': 0,
+            'shed': 0,
+            'degraded': 0
+        }
+
+    def set_fallback(self, result: Dict[str, Any]):
+        """
+        Register a precomputed forecast served under overload when nothing is cached
+
+        The fallback is not specific to the request's input, so it should carry
+        the input it was computed for (e.g. under 'input_data').
+
+        Args:
+            result: Prediction result in the same format as the model output
+        """
+        with self._lock:
+            self._fallback = result
+
+    def call(self, client_id: Optional[str], func: Callable[..., Dict[str, Any]],
+             *args, cache_key: Optional[Hashable] = None,
+             deadline: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Run a prediction function under admission control
+
+        Args:
+            client_id: Identifier used for per-client rate limiting, None when
+                the caller has already been rate limited (see check_rate)
+            func: Prediction function to call, e.g. AutoAIModelWrapper.predict
+            cache_key: Key under which the result is cached for degraded mode
+            deadline: Seconds this request may take, defaults to the controller deadline
+
+        Returns:
+            The prediction result, or a cached forecast marked as degraded
+
+        Raises:
+            AdmissionRejected: If the request is rate limited or shed
+        """
+        deadline = self.deadline if deadline is None else deadline
+        expires = time.monotonic() + deadline
+
+        if client_id is not None:
+            self.check_rate(client_id)
+
+        with self._lock:
+            slots_taken = self._running + self._waiting >= self.max_concurrent
+            if slots_taken and self._waiting >= self.max_queue:
+                return self._shed(cache_key, 'Prediction queue is full')
+
+            expected_wait = self._expected_wait()
+            if expected_wait > deadline:
+                return self._shed(cache_key, 'Prediction would not finish before its deadline',
+                                  retry_after=expected_wait)
+            self._waiting += 1
+
+        acquired = self._slots.acquire(timeout=max(0.0, expires - time.monotonic()))
+
+        with self._lock:
+            self._waiting -= 1
+            if not acquired:
+                return self._shed(cache_key, 'Timed out waiting for a free prediction slot')
+            self._running += 1
+            self.stats['admitted'] += 1
+
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started
+            self._slots.release()
+            with self._lock:
+                self._running -= 1
+                self._record_service_time(elapsed)
+
+        self._store(cache_key, result)
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        """Get the current load and counters of the controller"""
+        with self._lock:
+            return {
+                'running': self._running,
+                'waiting': self._waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'avg_service_time': self._service_time,
+                'degraded_mode': self.degraded_mode,
+                **self.stats
+            }
+
+    def check_rate(self, client_id: str):
+        """
+        Apply the per-client token bucket
+
+        Args:
+            client_id: Identifier used for per-client rate limiting
+
+        Raises:
+            AdmissionRejected: If the client is over its rate limit
+        """
+        with self._lock:
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_per_client, self.burst_per_client)
+                self._buckets[client_id] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client_id)
+
+            wait = bucket.take()
+            if wait > 0:
+                self.stats['rate_limited'] += 1
+                raise AdmissionRejected(429, 'Too many prediction requests', wait)
+
+    def _expected_wait(self) -> float:
+        """Estimate how long a new request would take to complete (lock held)"""
+        ahead = self._waiting + self._running
+        if self._service_time is None or ahead < self.max_concurrent:
+            # A free slot means the request starts immediately
+            return 0.0
+        batches = ahead // self.max_concurrent + 1
+        return batches * self._service_time
+
+    def _record_service_time(self, elapsed: float):
+        """Update the moving average of prediction latency (lock held)"""
+        if self._service_time is None:
+            self._service_time = elapsed
+        else:
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+
+    def _retry_after(self) -> float:
+        """Suggested backoff for shed requests (lock held)"""
+        return max(1.0, self._expected_wait())
+
+    def _shed(self, cache_key: Optional[Hashable], reason: str,
+              retry_after: Optional[float] = None) -> Dict[str, Any]:
+        """Serve a degraded forecast or reject the request (lock held)"""
+        if self.degraded_mode:
+            # Only a forecast for the same input, or the registered fallback,
+            # may stand in for this request
+            cached = self._cache.get(cache_key) if cache_key is not None else None
+            source = 'cache'
+            if cached is None:
+                cached = self._fallback
+                source = 'fallback'
+            if cached is not None:
+                self.stats['degraded'] += 1
+                return {**cached, 'degraded': True, 'degraded_source': source,
+                        'degraded_reason': reason}
+
+        self.stats['shed'] += 1
+        raise AdmissionRejected(503, reason, retry_after or self._retry_after())
+
+    def _store(self, cache_key: Optional[Hashable], result: Dict[str, Any]):
+        """Remember a successful forecast for degraded mode"""
+        if not self.degraded_mode or cache_key is None:
+            return
+        with self._lock:
+            self._cache[cache_key] = result
+            self._cache.move_to_end(cache_key)
+            if len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
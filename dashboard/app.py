@@ -1,4 +1,5 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context
+from werkzeug.middleware.proxy_fix import ProxyFix
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
@@ -7,31 +8,53 @@ import json
 from datetime import datetime, timedelta
 import os
 
+from model_integration import get_model_instance
+from admission_control import AdmissionController, AdmissionRejected
+from profiling import RequestProfiler, phase
+from export import build_export
+
 app = Flask(__name__)
 
-# Mock prediction function - Replace this with your actual model integration
-def make_prediction(input_data):
-    """
-    Mock prediction function that simulates the AutoAI model.
-    Replace this with actual model integration from your notebook.
-    """
-    # Simulate predictions based on input trends
-    base_values = {
-        'NO_OF_ROAD_WORK_SANCTIONED': np.random.randint(50, 200),
-        'NO_OF_BRIDGES_SANCTIONED': np.random.randint(10, 50),
-        'NO_OF_ROAD_WORKS_COMPLETED': np.random.randint(30, 150),
-        'NO_OF_BRIDGES_COMPLETED': np.random.randint(5, 40),
-        'NO_OF_BRIDGES_BALANCE': np.random.randint(5, 30)
-    }
-    
-    # Add some variation based on input
-    for key in base_values:
-        if key in input_data:
-            # Simulate trend continuation
-            trend_factor = 0.1 * (input_data[key] - 100) / 100
-            base_values[key] = int(base_values[key] * (1 + trend_factor))
-    
-    return base_values
+# Opt-in request profiling, configured through PROFILE_* environment variables
+profiler = RequestProfiler(app)
+
+# Admission control around model inference so bursts of /predict requests
+# are bounded instead of piling up behind the model
+admission = AdmissionController(
+    max_concurrent=int(os.environ.get('PREDICT_MAX_CONCURRENT', 4)),
+    max_queue=int(os.environ.get('PREDICT_MAX_QUEUE', 16)),
+    rate_per_client=float(os.environ.get('PREDICT_RATE_PER_CLIENT', 5)),
+    burst_per_client=int(os.environ.get('PREDICT_BURST_PER_CLIENT', 10)),
+    deadline=float(os.environ.get('PREDICT_DEADLINE_SECONDS', 5)),
+    degraded_mode=os.environ.get('PREDICT_DEGRADED_MODE', 'True').lower() == 'true'
+)
+
+# Only trust X-Forwarded-For when running behind a known number of proxies,
+# otherwise clients could pick their own rate limit key
+trusted_proxies = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+if trusted_proxies > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies)
+
+# Form defaults, also used to precompute the forecast served under overload
+DEFAULT_INPUT_DATA = {
+    'NO_OF_ROAD_WORK_SANCTIONED': 100.0,
+    'NO_OF_BRIDGES_SANCTIONED': 25.0,
+    'LENGTH_OF_ROAD_WORK_SANCTIONED': 1000.0,
+    'COST_OF_WORKS_SANCTIONED': 50000.0,
+    'LENGTH_OF_ROAD_WORK_COMPLETED': 800.0,
+    'EXPENDITURE_OCCURED': 40000.0,
+    'NO_OF_ROAD_WORKS_BALANCE': 20.0
+}
+
+if admission.degraded_mode:
+    admission.set_fallback({
+        **get_model_instance().predict(DEFAULT_INPUT_DATA),
+        'input_data': DEFAULT_INPUT_DATA
+    })
+
+def get_client_id():
+    """Identify the client for rate limiting"""
+    return request.remote_addr or 'unknown'
 
 def generate_historical_data():
     """Generate mock historical data for visualization"""
@@ -56,33 +79,37 @@ def index():
 def predict():
     try:
         # Get input data from form
+        defaults = DEFAULT_INPUT_DATA
         input_data = {
-            'NO_OF_ROAD_WORK_SANCTIONED': float(request.form.get('road_work_sanctioned', 100)),
-            'NO_OF_BRIDGES_SANCTIONED': float(request.form.get('bridges_sanctioned', 25)),
-            'LENGTH_OF_ROAD_WORK_SANCTIONED': float(request.form.get('length_road_sanctioned', 1000)),
-            'COST_OF_WORKS_SANCTIONED': float(request.form.get('cost_sanctioned', 50000)),
-            'LENGTH_OF_ROAD_WORK_COMPLETED': float(request.form.get('length_road_completed', 800)),
-            'EXPENDITURE_OCCURED': float(request.form.get('expenditure', 40000)),
-            'NO_OF_ROAD_WORKS_BALANCE': float(request.form.get('road_works_balance', 20))
+            'NO_OF_ROAD_WORK_SANCTIONED': float(request.form.get('road_work_sanctioned', defaults['NO_OF_ROAD_WORK_SANCTIONED'])),
+            'NO_OF_BRIDGES_SANCTIONED': float(request.form.get('bridges_sanctioned', defaults['NO_OF_BRIDGES_SANCTIONED'])),
+            'LENGTH_OF_ROAD_WORK_SANCTIONED': float(request.form.get('length_road_sanctioned', defaults['LENGTH_OF_ROAD_WORK_SANCTIONED'])),
+            'COST_OF_WORKS_SANCTIONED': float(request.form.get('cost_sanctioned', defaults['COST_OF_WORKS_SANCTIONED'])),
+            'LENGTH_OF_ROAD_WORK_COMPLETED': float(request.form.get('length_road_completed', defaults['LENGTH_OF_ROAD_WORK_COMPLETED'])),
+            'EXPENDITURE_OCCURED': float(request.form.get('expenditure', defaults['EXPENDITURE_OCCURED'])),
+            'NO_OF_ROAD_WORKS_BALANCE': float(request.form.get('road_works_balance', defaults['NO_OF_ROAD_WORKS_BALANCE']))
         }
         
-        # Make prediction
-        predictions = make_prediction(input_data)
-        
-        # Generate confidence intervals (mock)
-        confidence_intervals = {}
-        for key, value in predictions.items():
-            confidence_intervals[key] = {
-                'lower': max(0, int(value * 0.85)),
-                'upper': int(value * 1.15)
-            }
+        # Make prediction under admission control
+        cache_key = tuple(sorted(input_data.items()))
+        result = admission.call(get_client_id(), get_model_instance().predict, input_data,
+                                cache_key=cache_key)
         
-        return jsonify({
-            'success': True,
-            'predictions': predictions,
-            'confidence_intervals': confidence_intervals,
-            'input_data': input_data
+        with phase('json_encoding'):
+            # A degraded fallback reports the input it was computed for
+            return jsonify({
+                'success': True,
+                'input_data': input_data,
+                **result
+            })
+    
+    except AdmissionRejected as e:
+        response = jsonify({
+            'success': False,
+            'error': e.reason,
+            'retry_after': e.retry_after
         })
+        return response, e.status_code, {'Retry-After': e.retry_after_header}
     
     except Exception as e:
         return jsonify({
@@ -96,44 +123,46 @@ def get_historical_data():
     df = generate_historical_data()
     
     # Create interactive plot
-    fig = go.Figure()
+    with phase('plot_figure'):
+        fig = go.Figure()
     
-    # Add traces for each prediction column
-    prediction_columns = [
-        'NO_OF_ROAD_WORK_SANCTIONED',
-        'NO_OF_BRIDGES_SANCTIONED', 
-        'NO_OF_ROAD_WORKS_COMPLETED',
-        'NO_OF_BRIDGES_COMPLETED',
-        'NO_OF_BRIDGES_BALANCE'
-    ]
-    
-    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
+        # Add traces for each prediction column
+        prediction_columns = [
+            'NO_OF_ROAD_WORK_SANCTIONED',
+            'NO_OF_BRIDGES_SANCTIONED', 
+            'NO_OF_ROAD_WORKS_COMPLETED',
+            'NO_OF_BRIDGES_COMPLETED',
+            'NO_OF_BRIDGES_BALANCE'
+        ]
     
-    for i, col in enumerate(prediction_columns):
-        fig.add_trace(go.Scatter(
-            x=df['date'],
-            y=df[col],
-            mode='lines+markers',
-            name=col.replace('_', ' ').title(),
-            line=dict(color=colors[i], width=2),
-            marker=dict(size=6)
-        ))
+        colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
     
-    fig.update_layout(
-        title='Historical Infrastructure Data Trends',
-        xaxis_title='Date',
-        yaxis_title='Count',
-        hovermode='x unified',
-        template='plotly_white',
-        height=500
-    )
+        for i, col in enumerate(prediction_columns):
+            fig.add_trace(go.Scatter(
+                x=df['date'],
+                y=df[col],
+                mode='lines+markers',
+                name=col.replace('_', ' ').title(),
+                line=dict(color=colors[i], width=2),
+                marker=dict(size=6)
+            ))
     
-    graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        fig.update_layout(
+            title='Historical Infrastructure Data Trends',
+            xaxis_title='Date',
+            yaxis_title='Count',
+            hovermode='x unified',
+            template='plotly_white',
+            height=500
+        )
     
-    return jsonify({
-        'plot': graphJSON,
-        'data': df.to_dict('records')
-    })
+    with phase('json_encoding'):
+        graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        
+        return jsonify({
+            'plot': graphJSON,
+            'data': df.to_dict('records')
+        })
 
 @app.route('/model_info')
 def model_info():
@@ -173,5 +202,52 @@ def model_info():
     
     return jsonify(model_info)
 
+@app.route('/export')
+def export_report():
+    """API endpoint to stream history and forecasts as a CSV or Parquet report"""
+    fmt = request.args.get('format', 'csv').lower()
+    targets = [t.strip() for value in request.args.getlist('target') for t in value.split(',') if t.strip()]
+    model = get_model_instance()
+    
+    def predict_forecast(input_data):
+        # The export was rate limited as a whole, forecasts share the inference slots
+        return admission.call(None, model.predict, input_data,
+                              cache_key=tuple(sorted(input_data.items())))
+    
+    try:
+        admission.check_rate(get_client_id())
+        mimetype, stream = build_export(
+            fmt,
+            region=request.args.get('region'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            targets=targets or None,
+            model=model,
+            predict=predict_forecast
+        )
+    except AdmissionRejected as e:
+        response = jsonify({
+            'success': False,
+            'error': e.reason,
+            'retry_after': e.retry_after
+        })
+        return response, e.status_code, {'Retry-After': e.retry_after_header}
+    except (ValueError, ImportError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return Response(
+        stream_with_context(stream),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=infrastructure_report.{fmt}'}
+    )
+
+@app.route('/admission_status')
+def admission_status():
+    """API endpoint to get the current load on the prediction path"""
+    return jsonify(admission.status())
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -9,8 +9,13 @@ import random
 import datetime
 from typing import Dict, List, Any
 
+from profiling import RequestProfiler, phase
+
 app = Flask(__name__)
 
+# Opt-in request profiling, configured through PROFILE_* environment variables
+profiler = RequestProfiler(app)
+
 # Mock data and functions
 def generate_mock_prediction(input_data: Dict[str, float]) -> Dict[str, Any]:
     """Generate mock predictions based on input data"""
@@ -99,13 +104,15 @@ def predict():
                 input_data[feature_name] = 0.0
         
         # Generate prediction
-        result = generate_mock_prediction(input_data)
+        with phase('inference'):
+            result = generate_mock_prediction(input_data)
         
-        return jsonify({
-            'success': True,
-            **result,
-            'input_data': input_data
-        })
+        with phase('json_encoding'):
+            return jsonify({
+                'success': True,
+                **result,
+                'input_data': input_data
+            })
         
     except Exception as e:
         return jsonify({
@@ -119,41 +126,43 @@ def get_historical_data():
     try:
         data = generate_mock_historical_data()
         
-        # Create a simple plot structure (without plotly dependency)
-        plot_data = {
-            'data': [],
-            'layout': {
-                'title': 'Infrastructure Projects Historical Trends',
-                'xaxis': {'title': 'Date'},
-                'yaxis': {'title': 'Count'}
+        with phase('plot_figure'):
+            # Create a simple plot structure (without plotly dependency)
+            plot_data = {
+                'data': [],
+                'layout': {
+                    'title': 'Infrastructure Projects Historical Trends',
+                    'xaxis': {'title': 'Date'},
+                    'yaxis': {'title': 'Count'}
+                }
             }
-        }
         
-        # Add traces for each metric
-        metrics = [
-            ('NO_OF_ROAD_WORK_SANCTIONED', 'Road Work Sanctioned'),
-            ('NO_OF_BRIDGES_SANCTIONED', 'Bridges Sanctioned'),
-            ('NO_OF_ROAD_WORKS_COMPLETED', 'Road Works Completed'),
-            ('NO_OF_BRIDGES_COMPLETED', 'Bridges Completed'),
-            ('NO_OF_BRIDGES_BALANCE', 'Bridges Balance')
-        ]
+            # Add traces for each metric
+            metrics = [
+                ('NO_OF_ROAD_WORK_SANCTIONED', 'Road Work Sanctioned'),
+                ('NO_OF_BRIDGES_SANCTIONED', 'Bridges Sanctioned'),
+                ('NO_OF_ROAD_WORKS_COMPLETED', 'Road Works Completed'),
+                ('NO_OF_BRIDGES_COMPLETED', 'Bridges Completed'),
+                ('NO_OF_BRIDGES_BALANCE', 'Bridges Balance')
+            ]
         
-        for metric_key, metric_name in metrics:
-            x_values = [item['date'] for item in data]
-            y_values = [item[metric_key] for item in data]
+            for metric_key, metric_name in metrics:
+                x_values = [item['date'] for item in data]
+                y_values = [item[metric_key] for item in data]
             
-            plot_data['data'].append({
-                'x': x_values,
-                'y': y_values,
-                'type': 'scatter',
-                'mode': 'lines+markers',
-                'name': metric_name
-            })
+                plot_data['data'].append({
+                    'x': x_values,
+                    'y': y_values,
+                    'type': 'scatter',
+                    'mode': 'lines+markers',
+                    'name': metric_name
+                })
         
-        return jsonify({
-            'plot': json.dumps(plot_data),
-            'data': data
-        })
+        with phase('json_encoding'):
+            return jsonify({
+                'plot': json.dumps(plot_data),
+                'data': data
+            })
         
     except Exception as e:
         return jsonify({
@@ -0,0 +1,391 @@
+"""
+Bulk Export of Historical Data and Forecasts
+
+This module streams historical infrastructure data together with the model
+forecasts and confidence intervals as CSV or Parquet reports. History is read
+in chunks and every chunk is encoded and yielded before the next one is read,
+so memory stays flat regardless of the size of the export.
+
+It backs the /export endpoint of app.py and can also be run from the command line:
+
+    python export.py --format csv --start 2021-01 --target NO_OF_BRIDGES_COMPLETED -o report.csv
+"""
+
+import argparse
+import io
+import os
+import re
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from admission_control import AdmissionRejected
+from model_integration import get_model_instance
+
+# Sample data shipped with the repository, used when no history file is configured
+SAMPLE_HISTORY_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'sample', 'infrastructure_sample.csv'
+)
+
+# Sample data column names mapped to the model's target columns
+SAMPLE_COLUMN_MAP = {
+    'Road_Works_Sanctioned': 'NO_OF_ROAD_WORK_SANCTIONED',
+    'Bridges_Sanctioned': 'NO_OF_BRIDGES_SANCTIONED',
+    'Road_Works_Completed': 'NO_OF_ROAD_WORKS_COMPLETED',
+    'Bridges_Completed': 'NO_OF_BRIDGES_COMPLETED',
+    'Bridges_Balance': 'NO_OF_BRIDGES_BALANCE'
+}
+
+# Columns recognised as the region of a row, most specific first
+REGION_COLUMNS = ['REGION', 'DISTRICT_NAME', 'STATE_NAME']
+
+EXPORT_COLUMNS = ['region', 'date', 'target', 'kind', 'value', 'lower', 'upper']
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def resolve_history_path(path: Optional[str] = None) -> str:
+    """
+    Find the history file to export
+
+    Args:
+        path: Explicit path, defaults to the HISTORICAL_DATA_PATH environment variable
+
+    Returns:
+        The configured path, or the bundled sample data when no path is configured
+
+    Raises:
+        ValueError: If the configured path does not exist
+    """
+    path = path or os.environ.get('HISTORICAL_DATA_PATH')
+    if not path:
+        return SAMPLE_HISTORY_PATH
+    if not os.path.exists(path):
+        raise ValueError(f"History file not found: {path}")
+    return path
+
+
+def parse_export_date(value: str, is_end: bool = False) -> pd.Timestamp:
+    """
+    Parse a year, month or day as the start or end of that period
+
+    Args:
+        value: Date as 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD'
+        is_end: Return the last day of the period instead of the first
+
+    Returns:
+        The parsed date
+
+    Raises:
+        ValueError: If the date is not in one of the supported formats
+    """
+    if re.fullmatch(r'\d{4}', value):
+        offset = pd.offsets.YearEnd(0)
+    elif re.fullmatch(r'\d{4}-\d{2}', value):
+        offset = pd.offsets.MonthEnd(0)
+    elif re.fullmatch(r'\d{4}-\d{2}-\d{2}', value):
+        offset = None
+    else:
+        raise ValueError(f"Unsupported date: {value}. Use YYYY, YYYY-MM or YYYY-MM-DD")
+
+    date = pd.Timestamp(value)
+    if is_end and offset is not None:
+        date = date + offset
+    return date
+
+
+def iter_history_chunks(path: Optional[str] = None,
+                        chunksize: int = 10000) -> Iterator[pd.DataFrame]:
+    """
+    Read the history file in chunks with normalized columns
+
+    Args:
+        path: Path to the history CSV file
+        chunksize: Number of rows read at a time
+
+    Yields:
+        DataFrames with 'region', 'date' and the target columns
+    """
+    for chunk in pd.read_csv(resolve_history_path(path), chunksize=chunksize):
+        chunk = chunk.rename(columns=SAMPLE_COLUMN_MAP)
+
+        if 'date' in chunk.columns:
+            chunk['date'] = pd.to_datetime(chunk['date'])
+        else:
+            chunk['date'] = pd.to_datetime(pd.DataFrame({
+                'year': chunk['Year'], 'month': chunk['Month'], 'day': 1
+            }))
+
+        region_column = next((col for col in REGION_COLUMNS if col in chunk.columns), None)
+        chunk['region'] = chunk[region_column].astype(str) if region_column else 'ALL'
+
+        yield chunk
+
+
+def _history_frame(chunk: pd.DataFrame, targets: List[str]) -> pd.DataFrame:
+    """Reshape a wide history chunk into export rows, one per date and target"""
+    values = chunk.reindex(columns=targets).to_numpy(dtype=float)
+    rows, width = values.shape
+
+    return pd.DataFrame({
+        'region': np.repeat(chunk['region'].to_numpy(), width),
+        'date': np.repeat(chunk['date'].dt.strftime('%Y-%m-%d').to_numpy(), width),
+        'target': np.tile(np.array(targets, dtype=object), rows),
+        'kind': 'history',
+        'value': values.ravel(),
+        'lower': np.nan,
+        'upper': np.nan
+    }, columns=EXPORT_COLUMNS)
+
+
+def _forecast_frame(region: str, last_row: pd.Series, forecast_date: pd.Timestamp,
+                    targets: List[str], model,
+                    predict: Callable[[Dict[str, float]], Dict[str, Any]]) -> pd.DataFrame:
+    """Forecast the period after the last exported history row of a region"""
+    input_data = {col: float(last_row[col]) for col in model.target_columns
+                  if col in last_row.index and pd.notna(last_row[col])}
+
+    # The response is already streaming, so a shed forecast cannot fail the
+    # request; it is reported as unavailable rather than substituted
+    kind = 'forecast'
+    try:
+        result = predict(input_data)
+    except AdmissionRejected:
+        result = None
+    if result is None or result.get('degraded_source') == 'fallback':
+        kind = 'forecast_unavailable'
+        result = {'predictions': {}, 'confidence_intervals': {}}
+
+    rows = []
+    for target in targets:
+        interval = result['confidence_intervals'].get(target, {})
+        rows.append({
+            'region': region,
+            'date': forecast_date.strftime('%Y-%m-%d'),
+            'target': target,
+            'kind': kind,
+            'value': float(result['predictions'].get(target, np.nan)),
+            'lower': float(interval.get('lower', np.nan)),
+            'upper': float(interval.get('upper', np.nan))
+        })
+    return pd.DataFrame(rows, columns=EXPORT_COLUMNS)
+
+
+def iter_export_frames(region: Optional[str] = None, start: Optional[pd.Timestamp] = None,
+                       end: Optional[pd.Timestamp] = None, targets: Optional[List[str]] = None,
+                       model=None, path: Optional[str] = None, chunksize: int = 10000,
+                       predict: Optional[Callable[[Dict[str, float]], Dict[str, Any]]] = None
+                       ) -> Iterator[pd.DataFrame]:
+    """
+    Generate export rows for history followed by forecasts
+
+    Only the last history row of each region is kept in memory to seed its forecast.
+
+    Args:
+        region: Only export this region (case-insensitive)
+        start: Only export rows on or after this date
+        end: Only export rows on or before this date
+        targets: Target columns to export, defaults to all model targets
+        model: AutoAIModelWrapper used for forecasts
+        path: Path to the history CSV file
+        chunksize: Number of history rows processed at a time
+        predict: Forecast function, defaults to model.predict
+
+    Yields:
+        DataFrames with the EXPORT_COLUMNS columns
+    """
+    model = model or get_model_instance()
+    predict = predict or model.predict
+    targets = targets or model.target_columns
+    last_rows: Dict[str, pd.Series] = {}
+
+    for chunk in iter_history_chunks(path, chunksize):
+        mask = pd.Series(True, index=chunk.index)
+        if region:
+            mask &= chunk['region'].str.lower() == region.lower()
+        if start is not None:
+            mask &= chunk['date'] >= start
+        if end is not None:
+            mask &= chunk['date'] <= end
+        chunk = chunk[mask]
+        if chunk.empty:
+            continue
+
+        latest = chunk.loc[chunk.groupby('region', sort=False)['date'].idxmax()]
+        for _, row in latest.iterrows():
+            previous = last_rows.get(row['region'])
+            if previous is None or row['date'] >= previous['date']:
+                last_rows[row['region']] = row
+
+        yield _history_frame(chunk, targets)
+
+    for region_name, last_row in last_rows.items():
+        # The model forecasts one period (month) ahead
+        forecast_date = last_row['date'] + pd.DateOffset(months=1)
+        if end is not None and forecast_date > end:
+            continue
+        yield _forecast_frame(region_name, last_row, forecast_date, targets, model, predict)
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_csv(frames: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Encode export frames as CSV, one piece per frame"""
+    yield ','.join(EXPORT_COLUMNS).encode() + b'\n'
+    for frame in frames:
+        yield frame.to_csv(index=False, header=False).encode()
+
+
+def stream_parquet(frames: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Encode export frames as Parquet, one row group per frame"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('region', pa.string()),
+        ('date', pa.string()),
+        ('target', pa.string()),
+        ('kind', pa.string()),
+        ('value', pa.float64()),
+        ('lower', pa.float64()),
+        ('upper', pa.float64())
+    ])
+
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for frame in frames:
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def build_export(fmt: str = 'csv', region: Optional[str] = None, start: Optional[str] = None,
+                 end: Optional[str] = None, targets: Optional[List[str]] = None,
+                 model=None, path: Optional[str] = None, chunksize: Optional[int] = None,
+                 predict: Optional[Callable[[Dict[str, float]], Dict[str, Any]]] = None
+                 ) -> Tuple[str, Iterator[bytes]]:
+    """
+    Validate export options and create the streaming export
+
+    Validation happens here rather than inside the generator so that callers
+    can report bad options before any of the response has been sent.
+
+    Args:
+        fmt: 'csv' or 'parquet'
+        region: Only export this region
+        start: Start date as 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD'
+        end: End date as 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD', inclusive of the whole period
+        targets: Target columns to export, defaults to all model targets
+        model: AutoAIModelWrapper used for forecasts
+        path: Path to the history CSV file
+        chunksize: Number of history rows processed at a time (EXPORT_CHUNK_ROWS)
+        predict: Forecast function, e.g. one going through admission control
+
+    Returns:
+        Tuple of the MIME type and a generator of encoded bytes
+
+    Raises:
+        ValueError: If an option is invalid, or the history file does not exist or
+            lacks the date or requested region columns
+        ImportError: If Parquet is requested without pyarrow installed
+    """
+    fmt = fmt.lower()
+    if fmt not in EXPORT_MIMETYPES:
+        raise ValueError(f"Unsupported export format: {fmt}. Use one of: {', '.join(EXPORT_MIMETYPES)}")
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+
+    model = model or get_model_instance()
+    unknown = [t for t in targets or [] if t not in model.target_columns]
+    if unknown:
+        raise ValueError(f"Unknown target(s): {', '.join(unknown)}")
+
+    path = resolve_history_path(path)
+
+    # Check the header now, a missing column would otherwise only surface mid-stream
+    columns = set(pd.read_csv(path, nrows=0).columns)
+    if 'date' not in columns and not {'Year', 'Month'} <= columns:
+        raise ValueError("History has no date column: expected 'date' or 'Year' and 'Month'")
+    if region and region.upper() != 'ALL' and not columns & set(REGION_COLUMNS):
+        raise ValueError("History has no region column")
+
+    start_date = parse_export_date(start) if start else None
+    end_date = parse_export_date(end, is_end=True) if end else None
+    if start_date is not None and end_date is not None and start_date > end_date:
+        raise ValueError("Start date must not be after end date")
+
+    chunksize = chunksize or int(os.environ.get('EXPORT_CHUNK_ROWS', 10000))
+    frames = iter_export_frames(region, start_date, end_date, targets, model, path, chunksize, predict)
+    encoder = stream_parquet if fmt == 'parquet' else stream_csv
+    return EXPORT_MIMETYPES[fmt], encoder(frames)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Export historical data and forecasts as CSV or Parquet')
+    parser.add_argument('--format', default='csv', choices=sorted(EXPORT_MIMETYPES), help='Output format')
+    parser.add_argument('--region', help='Only export this region')
+    parser.add_argument('--start', help='Start date, e.g. 2021-01')
+    parser.add_argument('--end', help='End date, e.g. 2022-12')
+    parser.add_argument('--target', action='append', help='Target column to export (repeatable)')
+    parser.add_argument('--input', help='History CSV file, defaults to HISTORICAL_DATA_PATH or the sample data')
+    parser.add_argument('--chunksize', type=int, help='History rows processed at a time')
+    parser.add_argument('-o', '--output', help='Output file, defaults to stdout')
+    args = parser.parse_args(argv)
+
+    try:
+        _, stream = build_export(args.format, args.region, args.start, args.end, args.target,
+                                 path=args.input, chunksize=args.chunksize)
+    except (ValueError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for data in stream:
+            output.write(data)
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,6 +11,8 @@ from typing import Dict, Any, List
 import pickle
 import os
 
+from profiling import phase
+
 class AutoAIModelWrapper:
     """Wrapper class for the AutoAI model integration"""
     
@@ -109,18 +111,21 @@ class AutoAIModelWrapper:
             Dictionary containing predictions and confidence intervals
         """
         if not self.is_loaded or self.model is None:
-            return self._mock_prediction(input_data)
+            with phase('inference'):
+                return self._mock_prediction(input_data)
         
         try:
             # Preprocess input
-            processed_data = self.preprocess_input(input_data)
+            with phase('preprocess_input'):
+                processed_data = self.preprocess_input(input_data)
             
             # Make prediction using the actual model
             # Replace this with actual prediction code
             # predictions = self.model.predict(processed_data)
             
             # For now, return mock predictions
-            return self._mock_prediction(input_data)
+            with phase('inference'):
+                return self._mock_prediction(input_data)
             
         except Exception as e:
             print(f"Error making prediction: {e}")
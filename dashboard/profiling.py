@@ -0,0 +1,297 @@
+"""
+On-Demand Request Profiling for the Flask Dashboards
+
+This module adds an opt-in profiling surface to app.py and app_simple.py.
+A configurable fraction of requests, or any request carrying the profiling
+header with the configured token, is profiled with either a low-overhead stack sampler or cProfile.
+Collapsed stacks (flamegraph.pl / speedscope format) are saved per route along
+with a breakdown of time spent in the named phases of the request.
+
+Only the standard library is used so the simplified dashboard can profile too.
+"""
+
+import cProfile
+import glob
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Per-thread record of the request currently being profiled
+_state = threading.local()
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Time a named phase of the current request
+
+    This is a no-op unless the request is being profiled, so it can be left
+    around preprocessing, inference, figure building and JSON encoding.
+
+    Args:
+        name: Phase name reported in the breakdown, e.g. 'inference'
+    """
+    record = getattr(_state, 'record', None)
+    if record is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = record['phases']
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - started
+
+
+class StackSampler:
+    """Samples the stack of a single thread at a fixed interval"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+
+class RequestProfiler:
+    """Flask extension that profiles sampled requests"""
+
+    def __init__(self, app=None, enabled: Optional[bool] = None,
+                 sample_rate: Optional[float] = None, header: Optional[str] = None,
+                 token: Optional[str] = None, mode: Optional[str] = None,
+                 output_dir: Optional[str] = None, interval: Optional[float] = None,
+                 max_bytes: Optional[int] = None, max_prof_files: Optional[int] = None):
+        """
+        Initialize the profiler, falling back to PROFILE_* environment variables
+
+        Args:
+            app: Flask application to attach to
+            enabled: Whether profiling can happen at all (PROFILE_ENABLED)
+            sample_rate: Fraction of requests to profile (PROFILE_SAMPLE_RATE)
+            header: Request header that forces profiling (PROFILE_HEADER)
+            token: Header value required to force profiling (PROFILE_TOKEN),
+                header profiling is disabled when no token is set
+            mode: 'sample' for the stack sampler or 'cprofile' (PROFILE_MODE)
+            output_dir: Directory for profile output (PROFILE_DIR)
+            interval: Stack sampling interval in seconds (PROFILE_INTERVAL)
+            max_bytes: Size at which output files are rotated (PROFILE_MAX_BYTES)
+            max_prof_files: cProfile dumps kept per route (PROFILE_MAX_PROF_FILES)
+        """
+        env = os.environ.get
+        self.enabled = enabled if enabled is not None else env('PROFILE_ENABLED', 'False').lower() == 'true'
+        self.sample_rate = sample_rate if sample_rate is not None else float(env('PROFILE_SAMPLE_RATE', 0.0))
+        self.header = header or env('PROFILE_HEADER', 'X-Profile')
+        self.token = token or env('PROFILE_TOKEN', '')
+        self.mode = mode or env('PROFILE_MODE', 'sample')
+        self.output_dir = output_dir or env('PROFILE_DIR', 'profiles')
+        self.interval = interval if interval is not None else float(env('PROFILE_INTERVAL', 0.005))
+        self.max_bytes = max_bytes if max_bytes is not None else int(env('PROFILE_MAX_BYTES', 10 * 1024 * 1024))
+        self.max_prof_files = max_prof_files if max_prof_files is not None else int(env('PROFILE_MAX_PROF_FILES', 20))
+        self._write_lock = threading.Lock()
+
+        if self.mode not in ('sample', 'cprofile'):
+            raise ValueError(f"Unknown profiling mode: {self.mode}")
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the request hooks on a Flask application"""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions['request_profiler'] = self
+
+    def should_profile(self, request) -> bool:
+        """Decide whether a request is profiled"""
+        if not self.enabled:
+            return False
+        value = request.headers.get(self.header)
+        # Compare bytes, compare_digest rejects non-ASCII str
+        if self.token and value and hmac.compare_digest(value.encode('utf-8'), self.token.encode('utf-8')):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _before_request(self):
+        from flask import request
+
+        _state.record = None
+        if not self.should_profile(request):
+            return
+
+        record = {
+            'route': request.url_rule.rule if request.url_rule else request.path,
+            'phases': {},
+            'started': time.perf_counter(),
+            'profiler': None,
+            'sampler': None
+        }
+
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active on this interpreter
+                return
+            record['profiler'] = profiler
+        else:
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            sampler.start()
+            record['sampler'] = sampler
+
+        _state.record = record
+
+    def _after_request(self, response):
+        record = getattr(_state, 'record', None)
+        if record is None:
+            return response
+
+        if response.is_streamed:
+            # The body is generated after this hook, so keep measuring until
+            # the server closes the response
+            record['streamed'] = True
+            response.call_on_close(lambda: self._close_streamed(record))
+            return response
+
+        timings = self._complete(record)
+        response.headers['Server-Timing'] = ', '.join(
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()
+        )
+        return response
+
+    def _teardown_request(self, exc=None):
+        # Requests that raised never reach after_request; streamed responses
+        # keep their record so phases inside the body are timed, and are
+        # finished when they are closed
+        record = getattr(_state, 'record', None)
+        if record is not None and record.get('streamed'):
+            return
+        if record is not None:
+            self._finish(record)
+        _state.record = None
+
+    def _close_streamed(self, record: Dict):
+        """Finish a streamed response once the server has closed it"""
+        self._complete(record)
+        if getattr(_state, 'record', None) is record:
+            _state.record = None
+
+    def _complete(self, record: Dict) -> Dict[str, float]:
+        """Stop profiling a request and save its output"""
+        self._finish(record)
+        total = time.perf_counter() - record['started']
+        timings = dict(record['phases'], total=total)
+
+        try:
+            self._save(record, timings)
+        except OSError as e:
+            print(f"Error saving profile: {e}")
+        return timings
+
+    def _finish(self, record: Dict):
+        if record['profiler'] is not None:
+            record['profiler'].disable()
+        if record['sampler'] is not None:
+            record['sampler'].stop()
+            record['stacks'] = record['sampler'].stacks
+            record['sampler'] = None
+
+    def _save(self, record: Dict, timings: Dict[str, float]):
+        """Write collapsed stacks and the phase breakdown for the route"""
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', record['route']).strip('_') or 'index'
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, slug)
+
+        if record['profiler'] is not None:
+            stacks = self._collapse_cprofile(record['profiler'])
+        else:
+            stacks = record.get('stacks', Counter())
+
+        with self._write_lock:
+            if record['profiler'] is not None:
+                # Keep only the most recent dumps for the route
+                dumps = sorted(glob.glob(f"{base}-*.prof"), key=os.path.getmtime)
+                for old in dumps[:max(0, len(dumps) - self.max_prof_files + 1)]:
+                    os.remove(old)
+                record['profiler'].dump_stats(f"{base}-{time.strftime('%Y%m%d-%H%M%S')}-{id(record)}.prof")
+
+            self._rotate(f"{base}.collapsed")
+            self._rotate(f"{base}.phases.jsonl")
+
+            with open(f"{base}.collapsed", 'a') as f:
+                for stack, count in stacks.items():
+                    f.write(f"{stack} {count}\n")
+
+            with open(f"{base}.phases.jsonl", 'a') as f:
+                f.write(json.dumps({
+                    'route': record['route'],
+                    'timestamp': time.time(),
+                    'mode': self.mode,
+                    'phases_ms': {name: round(seconds * 1000, 3) for name, seconds in timings.items()}
+                }) + '\n')
+
+    def _rotate(self, path: str):
+        """Move a full output file aside, keeping a single previous copy (lock held)"""
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+            os.replace(path, f"{path}.1")
+
+    @staticmethod
+    def _collapse_cprofile(profiler: cProfile.Profile) -> Counter:
+        """
+        Approximate collapsed stacks from cProfile caller/callee data
+
+        cProfile only records one level of callers, so each line is a
+        caller;callee pair weighted by the callee's own time in microseconds.
+        """
+        import pstats
+
+        stacks = Counter()
+        for (filename, lineno, name), (_, _, tottime, _, callers) in pstats.Stats(profiler).stats.items():
+            callee = f"{name} ({os.path.basename(filename)}:{lineno})"
+            weight = int(tottime * 1e6)
+            if weight <= 0:
+                continue
+            if not callers:
+                stacks[callee] += weight
+                continue
+            caller_total = sum(c[2] for c in callers.values())
+            if caller_total <= 0:
+                stacks[callee] += weight
+                continue
+            for (c_file, c_line, c_name), (_, _, c_tottime, _) in callers.items():
+                caller = f"{c_name} ({os.path.basename(c_file)}:{c_line})"
+                share = int(weight * c_tottime / caller_total)
+                if share > 0:
+                    stacks[f"{caller};{callee}"] += share
+        return stacks